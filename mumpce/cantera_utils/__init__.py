@@ -6,6 +6,7 @@ sys.path.append(os.path.dirname(__file__))
 
 #import mumpce_py as mumpce
 import mumpce
+from cantera_chemistry_model import PType,A_FACTOR_TYPES,ENERGY_TYPES,FALLOFF_TYPES
 from initialize import rxn_initialize,ign_initialize,fls_initialize,measurement_initialize,measurement_initialize_pd,measurement_initialize_xl
 
 
@@ -1,7 +1,12 @@
 from state_definition import StateDefinition
 from abc import ABCMeta, abstractmethod
+from enum import IntEnum
 import cantera as ct
-import time
+import copy
+import hashlib
+import os
+import pickle
+import concurrent.futures
 import mumpce
 
 #This is added because mumpce may not be in the path and we know that mumpce exists upstairs from cantera_chemistry_model
@@ -23,6 +28,103 @@ import numpy as np
 # except ImportError:
 #     tqfunc = idfunc
 
+#Numba is optional. If it is not available, the compiled helpers run as ordinary Python functions
+try:
+    import numba
+    _njit = numba.njit(cache=True,fastmath=True)
+except ImportError:
+    def _njit(func):
+        return func
+
+@_njit
+def _finalize(valuep,valuem,value,perturbation,out):
+    """Computes the central-difference sensitivity coefficients from the perturbed model values
+    
+    :param valuep: The model values with each parameter perturbed upward
+    :param valuem: The model values with each parameter perturbed downward
+    :param value: The unperturbed model value
+    :param perturbation: The perturbation used in the sensitivity analysis
+    :param out: The array that will receive the sensitivity coefficients
+    :returns: out
+    :rtype: ndarray
+    """
+    out[:] = (valuep - valuem) / (2.0 * perturbation * value)
+    return out
+
+#The format version of the parameter information cache files. Increase it whenever get_model_parameter_info or get_reaction_info change what they produce, so that old cache files are not used
+_PARAMETER_INFO_CACHE_VERSION = 1
+
+#The copy of the model owned by a sensitivity worker process. See _sensitivity_worker_init
+_worker_model = None
+
+#Unperturbed Cantera Solution objects, keyed by chemistry model and file modification time. See CanteraChemistryModel._get_gas
+_SOLUTION_CACHE = {}
+
+class PType(IntEnum):
+    """Integer codes for the parameter types found by :func:`CanteraChemistryModel.get_reaction_info`
+    
+    * A: Pre-exponential factor of an elementary or three-body reaction
+    * E: Activation energy of an elementary or three-body reaction
+    * HpA, HpE: High-pressure limit pre-exponential factor and activation energy of a falloff reaction
+    * LpA, LpE: Low-pressure limit pre-exponential factor and activation energy of a falloff reaction
+    * Eff: Third-body collision efficiency
+    """
+    A = 0
+    E = 1
+    HpA = 2
+    HpE = 3
+    LpA = 4
+    LpE = 5
+    Eff = 6
+
+#Groups of parameter types, for use in place of testing the parameter type directly
+A_FACTOR_TYPES = (PType.A,PType.HpA,PType.LpA)
+ENERGY_TYPES = (PType.E,PType.HpE,PType.LpE)
+FALLOFF_TYPES = (PType.HpA,PType.HpE,PType.LpA,PType.LpE)
+
+#Whether each Cantera reaction type has (third-body efficiencies, falloff behavior)
+#2: three-body reaction, 4: falloff reaction, 8: chemically-activated reaction
+_REACTION_TYPE_FLAGS = {2:(True,False),
+                        4:(True,True),
+                        8:(True,True)}
+
+#Functions that read a rate parameter from a Cantera reaction object, keyed by parameter type
+_PARAMETER_GETTERS = {PType.A: lambda reaction: reaction.rate.pre_exponential_factor,
+                      PType.E: lambda reaction: reaction.rate.activation_energy,
+                      PType.HpA: lambda reaction: reaction.high_rate.pre_exponential_factor,
+                      PType.HpE: lambda reaction: reaction.high_rate.activation_energy,
+                      PType.LpA: lambda reaction: reaction.low_rate.pre_exponential_factor,
+                      PType.LpE: lambda reaction: reaction.low_rate.activation_energy}
+
+#The rate expression that holds each type of rate parameter, keyed by parameter type
+_RATE_ATTRIBUTES = {PType.A:'rate',PType.E:'rate',
+                    PType.HpA:'high_rate',PType.HpE:'high_rate',
+                    PType.LpA:'low_rate',PType.LpE:'low_rate'}
+
+def _sensitivity_worker_init(state_bytes,multipliers):
+    """Reconstruct a model inside a worker process of :func:`CanteraChemistryModel.sensitivity`
+    
+    :param state_bytes: The pickled model, which must have had its chemistry blanked before pickling
+    :param multipliers: A list of (parameter_id,multiplier) pairs for the parameters that were perturbed in the parent model
+    :type state_bytes: bytes
+    :type multipliers: list of tuples
+    """
+    global _worker_model
+    _worker_model = pickle.loads(state_bytes)
+    _worker_model.initialize_chemistry()
+    #Reproduce any perturbations that were applied to the parent model before the sensitivity analysis
+    for (param_id,multiplier) in multipliers:
+        _worker_model.perturb_parameter(param_id,multiplier)
+    _worker_model._sens_flag = True
+
+def _sensitivity_worker(param_id,pos_pert,neg_pert,mult_base):
+    """Evaluate the positively- and negatively-perturbed model for one parameter inside a worker process. See :func:`CanteraChemistryModel._evaluate_perturbed`
+    
+    :returns: valuep,valuem
+    :rtype: float,float
+    """
+    return _worker_model._evaluate_perturbed(param_id,pos_pert,neg_pert,mult_base)
+
 class CanteraChemistryModel(mumpce.Model):
     """A class for Cantera chemistry models.
     
@@ -33,6 +135,7 @@ class CanteraChemistryModel(mumpce.Model):
     
     :key no_falloff: If False, the falloff parameters for reactions will be available as active parameters (default True)
     :key no_energies: if False, the activation energies will be available as active parameters. (default True)
+    :key n_workers: The number of processes used by :func:`sensitivity` to evaluate the perturbed models. (default 1, serial)
     
     :type T: float
     :type Patm: float
@@ -64,7 +167,7 @@ class CanteraChemistryModel(mumpce.Model):
     
     def __init__(self,
                  T,Patm,composition,
-                 chemistry_model,**kwargs):
+                 chemistry_model,n_workers=1,**kwargs):
         #Initialize the reactor's intial state
         self.initial = StateDefinition(T,Patm,composition)
         
@@ -74,6 +177,13 @@ class CanteraChemistryModel(mumpce.Model):
         # Create the sensitivity flag which will tell the evaluate method whether we are in a sensitivity calculation or not
         self._sens_flag = False
         
+        # The number of worker processes used for the perturbed evaluations in the sensitivity analysis
+        self.n_workers = n_workers
+        
+        # The restart methods of this class do nothing, so the sensitivity analysis only calls them if a subclass has replaced them
+        self._has_load_restart = type(self).load_restart is not CanteraChemistryModel.load_restart
+        self._has_save_restart = type(self).save_restart is not CanteraChemistryModel.save_restart
+        
         # Initialize the Cantera mixture, thermo, and chemical model
         self.prepare_chemistry(**kwargs)
         self.tqfunc = mumpce.tqfunc #tqdm.tqdm
@@ -88,9 +198,12 @@ class CanteraChemistryModel(mumpce.Model):
         self.blank_chemistry()
         return
     
-    def prepare_chemistry(self,no_efficiencies=True,no_energy=True,no_falloff=True,**kwargs):
+    def prepare_chemistry(self,no_efficiencies=True,no_energy=True,no_falloff=True,invalidate_cache=False,**kwargs):
         """Instantiate the Cantera chemistry model and get information about the reaction model. This is called during instantiation of the model and normally would not be called at any other time.
         
+        The parameter information is cached on disk, keyed by the contents of the chemistry model file and the no_* flags, so that later models built from the same file do not need to enumerate its reactions. See :func:`_parameter_info_cache_path`
+        
+        :key invalidate_cache: If True, ignore any cached parameter information and rebuild it from the chemistry model (default False)
         """
         
         #Flags telling whether we will be optimiziing
@@ -101,19 +214,81 @@ class CanteraChemistryModel(mumpce.Model):
         #Call the blank_chemistry function in order to create the chemistry and simulation attributes, initialized to None
         self.blank_chemistry()
         
-        #Create the Cantera gas object from the chemistry model and set its initial state
-        self.initialize_chemistry()
-        
-        #Get the parameters that will be investigated for sensitivity analysis and find how many there are
-        #self.model_parameter_info = self.get_model_parameter_info(no_efficiencies=True,no_energy=True,no_falloff=True)
-        self.model_parameter_info = self.get_model_parameter_info(no_efficiencies=no_efficiencies,
-                                                                  no_energy=no_energy,
-                                                                  no_falloff=no_falloff)
+        cache_path = self._parameter_info_cache_path()
+        self.model_parameter_info = None
+        if cache_path is not None and os.path.isfile(cache_path) and not invalidate_cache:
+            #Reuse the parameter information from a previous model built from the same chemistry model
+            try:
+                with open(cache_path,'rb') as cache_file:
+                    self.model_parameter_info = pickle.load(cache_file)
+            except (IOError,OSError,EOFError,pickle.UnpicklingError):
+                self.model_parameter_info = None #The cache file is unreadable or incomplete, so rebuild it below
+        if self.model_parameter_info is None:
+            #Create the Cantera gas object from the chemistry model and set its initial state
+            self.initialize_chemistry()
+            
+            #Get the parameters that will be investigated for sensitivity analysis and find how many there are
+            #self.model_parameter_info = self.get_model_parameter_info(no_efficiencies=True,no_energy=True,no_falloff=True)
+            self.model_parameter_info = self.get_model_parameter_info(no_efficiencies=no_efficiencies,
+                                                                      no_energy=no_energy,
+                                                                      no_falloff=no_falloff,
+                                                                      model=self.gas)
+            if cache_path is not None:
+                try:
+                    if not os.path.isdir(os.path.dirname(cache_path)):
+                        os.makedirs(os.path.dirname(cache_path))
+                    #Write to a temporary file and move it into place, so that a model being constructed in parallel never reads a partial file
+                    temp_path = '{}.{:d}.tmp'.format(cache_path,os.getpid())
+                    with open(temp_path,'wb') as cache_file:
+                        pickle.dump(self.model_parameter_info,cache_file)
+                    os.replace(temp_path,cache_path)
+                except (IOError,OSError):
+                    pass #The cache is only an optimization, so carry on without it
         self.number_parameters = len(self.model_parameter_info)
         
+        #Store the parameter metadata as flat arrays so that get_parameter and perturb_parameter do not have to parse it
+        self._build_parameter_arrays()
+        
         #Blank the chemistry so that the model can be pickled
         self.blank_chemistry()
     
+    def _parameter_info_cache_path(self):
+        """Returns the file that caches the parameter information for this chemistry model and these no_* flags
+        
+        The file is ~/.cache/mumpce/<sha256 of the chemistry model file>-<flags>-ct<Cantera version>-v<format version>.pkl. The Cantera version is part of the name because reaction types and reaction data can change between Cantera releases. If the chemistry model is not a file on disk (for instance, a file that Cantera finds in its own data directory), nothing is cached.
+        
+        :returns: cache_path
+        :rtype: str or None
+        """
+        if not os.path.isfile(self.chemistry_model):
+            return None
+        with open(self.chemistry_model,'rb') as chem_file:
+            chem_hash = hashlib.sha256(chem_file.read()).hexdigest()
+        flags = '{:d}{:d}{:d}'.format(self.no_efficiencies,self.no_energy,self.no_falloff)
+        cache_name = '{}-{}-ct{}-v{:d}.pkl'.format(chem_hash,flags,ct.__version__,_PARAMETER_INFO_CACHE_VERSION)
+        return os.path.join(os.path.expanduser('~'),'.cache','mumpce',cache_name)
+    
+    def _build_parameter_arrays(self):
+        """Creates struct-of-arrays copies of the information in self.model_parameter_info, indexed by parameter identifier
+        
+        * self._rxn_num: The reaction number of each parameter
+        * self._ptype_code: The integer code of each parameter type, see :class:`PType`
+        * self._value_base: The original value of each parameter
+        * self._couple_low: Whether perturbing the parameter also perturbs the low-pressure A factor by the same factor
+        * self._use_multiplier: Whether the parameter is perturbed through the Cantera reaction rate multiplier
+        * self._param_name_by_id: The display name of each parameter, used when writing the sensitivity logs
+        
+        """
+        info = self.model_parameter_info
+        self._rxn_num = np.fromiter((p['reaction_number'] for p in info),dtype=np.int32,count=len(info))
+        self._ptype_code = np.fromiter((p['parameter_type'] for p in info),dtype=np.int8,count=len(info))
+        self._value_base = np.fromiter((p['parameter_value'] for p in info),dtype=np.float64,count=len(info))
+        self._couple_low = (self._ptype_code == PType.HpA) & bool(self.no_falloff)
+        #Scaling the A factor of an elementary reaction, or both A factors of a falloff reaction, is the same as scaling its rate multiplier
+        self._use_multiplier = (self._ptype_code == PType.A) | self._couple_low
+        self._param_name_by_id = [p['parameter_name'] for p in info]
+        return
+    
     def initialize_chemistry(self):
         """Create the Cantera phase object and set its initial state
         
@@ -125,11 +300,47 @@ class CanteraChemistryModel(mumpce.Model):
         """
         #If the gas object is blank, create the Cantera solution object
         if self.gas is None:
-            self.gas = ct.Solution(self.chemistry_model)
+            self.gas = self._get_gas()
+            #Keep one reaction object per reaction. perturb_parameter passes these same objects back to modify_reaction, so they always match the reactions held by the phase object
+            self._reactions = [self.gas.reaction(i) for i in range(self.gas.n_reactions)]
+            self._original_rates = {}
         #Set the gas initial condition
         self.gas.TPX = self.initial.T, self.initial.P, self.initial.composition
         return
     
+    def _get_gas(self):
+        """Create a new Cantera Solution object for this chemistry model
+        
+        The chemistry model is parsed only once per process. The parsed Solution is kept in _SOLUTION_CACHE as a template. Each model gets a copy built from the template's species and from new reaction objects made from the template's reaction data. 
+        The reactions must not be shared, because perturb_parameter changes the reaction objects in place. The template is rebuilt if the chemistry model file changes
+        
+        Building the copy from reaction data needs Reaction.from_dict, which is available from Cantera 2.6. Older versions of Cantera parse the chemistry model file for every new phase object, so they do not get this speedup. 
+        Either way, this is only called when a model creates its phase object: :func:`reset_model` resets the existing phase object in place
+        
+        :returns: A Cantera Solution object that is not shared with any other model
+        :rtype: Cantera.Solution
+        """
+        if os.path.isfile(self.chemistry_model):
+            key = (os.path.abspath(self.chemistry_model),os.path.getmtime(self.chemistry_model))
+        else:
+            key = (self.chemistry_model,None)
+        
+        template = _SOLUTION_CACHE.get(key)
+        if template is None:
+            template = ct.Solution(self.chemistry_model)
+            _SOLUTION_CACHE[key] = template
+        
+        try:
+            #Make new reaction objects rather than passing template.reactions(), which would share the template's reactions with every copy
+            reactions = [ct.Reaction.from_dict(reaction.input_data,template) for reaction in template.reactions()]
+            gas = ct.Solution(thermo=template.thermo_model,species=template.species(),
+                              kinetics=template.kinetics_model,reactions=reactions,
+                              transport_model=template.transport_model)
+        except (AttributeError,TypeError,ct.CanteraError):
+            #Older versions of Cantera cannot build reactions and Solutions from data this way, so parse the chemistry model again
+            gas = ct.Solution(self.chemistry_model)
+        return gas
+    
     @abstractmethod
     def initialize_reactor(self):
         """Initialize the Cantera reactor and simulation objects. This must have the following form::
@@ -150,6 +361,9 @@ class CanteraChemistryModel(mumpce.Model):
         self.gas = None
         self.reactor = None
         self.simulation = None
+        #The Cantera reaction objects belong to the phase object, so they are erased with it
+        self._reactions = None
+        self._original_rates = {}
     
     def load_restart(self,filename=None,solution_name=None):
         """Load a previously-saved solution from a restart file.
@@ -186,138 +400,67 @@ class CanteraChemistryModel(mumpce.Model):
         :returns: parameter_value
         :rtype: float
         """   
-        param_info = self.model_parameter_info[parameter_id]
-        reaction_number = param_info['reaction_number']
-        parameter_type = param_info['parameter_type']
-        parameter_value_base = param_info['parameter_value']
-
-        #print param_info
-        #print parameter_type
-
-        reaction = self.gas.reaction(reaction_number)
-        rtype = reaction.reaction_type
-        #print rtype
-
-        pressurestring = 'pressure'
-        HasFallOff = False
-        if pressurestring in parameter_type:
-            HasFallOff = True
-        if HasFallOff:
-            highrate = reaction.high_rate
-            lowrate = reaction.low_rate
-            if 'High' in parameter_type:
-                if 'A' in parameter_type:
-                    parameter_value = highrate.pre_exponential_factor
-                if 'E' in parameter_type:
-                    parameter_value = highrate.activation_energy
-            if 'Low' in parameter_type:
-                if 'A' in parameter_type:
-                    parameter_value = lowrate.pre_exponential_factor
-                if 'E' in parameter_type:
-                    parameter_value = lowrate.activation_energy
+        if self._use_multiplier[parameter_id]:
+            return self.gas.multiplier(self._rxn_num[parameter_id])
+        
+        code = self._ptype_code[parameter_id]
+        reaction = self._reactions[self._rxn_num[parameter_id]]
+        
+        if code == PType.Eff:
+            parameter_value = reaction.efficiency(self.model_parameter_info[parameter_id]['species'])
         else:
-            rate = reaction.rate
-            if 'A' in parameter_type:
-                parameter_value = rate.pre_exponential_factor
-            if 'E' in parameter_type:
-                parameter_value = rate.activation_energy        
+            parameter_value = _PARAMETER_GETTERS[code](reaction)
         
-        multiplier = parameter_value/parameter_value_base
+        multiplier = parameter_value/self._value_base[parameter_id]
         
         return multiplier
 
     def perturb_parameter(self,parameter_id,perturbation):
         """Replaces a model parameter's value by a new value.
 
-        This will multiply a reaction's pre-exponential factor or activation energy by a specified factor.
+        This will multiply a reaction's pre-exponential factor or activation energy by a specified factor. Pre-exponential factors that scale the whole rate constant are changed through the reaction's rate multiplier, which avoids rebuilding the reaction.
+
+        The factor is relative to the parameter's original value, not its current value, so it is the same number that :func:`get_parameter` returns. It is applied directly, either as the rate multiplier or to the original parameter value, and the low-pressure A factor of a falloff reaction follows the high-pressure A factor through the same multiplier.
 
+        Third-body efficiencies cannot be perturbed. Cantera's modify_reaction replaces only the rate expression of a three-body or falloff reaction and leaves the efficiencies in the kinetics object unchanged, so a new efficiency would never be used. A factor other than 1 for an efficiency raises NotImplementedError.
+        
         :param parameter_id: The parameter identifier. 
         :type parameter_id: int
-        :param new_value: The amount to change the parameters value.
-        :type new_value: float
+        :param perturbation: The factor relative to the original parameter value.
+        :type perturbation: float
         """
-        param_info = self.model_parameter_info[parameter_id]
-        reaction_number = param_info['reaction_number']
-        parameter_type = param_info['parameter_type']
-        new_value = param_info['parameter_value']*perturbation
-
-        #print param_info
-        #print parameter_type
-
-        reaction = self.gas.reaction(reaction_number)
-        rtype = reaction.reaction_type
-        #print rtype 
-        #print reaction.rate
+        reaction_number = self._rxn_num[parameter_id]
+        if self._use_multiplier[parameter_id]:
+            self.gas.set_multiplier(perturbation,reaction_number)
+            return
+        
+        code = self._ptype_code[parameter_id]
+        if code == PType.Eff:
+            if perturbation == 1.0:
+                return #The efficiency is never changed, so it is already at its original value
+            raise NotImplementedError('Third-body efficiencies cannot be perturbed, because Cantera does not update them in modify_reaction: ' + 
+                                      self._param_name_by_id[parameter_id])
+        
+        new_value = self._value_base[parameter_id]*perturbation
 
-        rxn_eq = reaction.equation
-        
-        time_start = time.time()
- 
-        pressurestring = 'pressure'
-        HasFallOff = False
-        PerturbLow = False
-        #Check if this is a falloff reaction
-        if pressurestring in parameter_type:
-            HasFallOff = True
-        if HasFallOff:
-            highrate = reaction.high_rate
-            lowrate = reaction.low_rate
-            #Check to see if this is the high-pressure rate constant
-            if 'High' in parameter_type:
-                A = highrate.pre_exponential_factor
-                b = highrate.temperature_exponent
-                E = highrate.activation_energy
-                if 'A' in parameter_type:
-                    A = new_value
-                    #perturbation = new_value/A # We need to know what the perturbation is
-                if 'E' in parameter_type:
-                    E = new_value
-                reaction.high_rate = ct.Arrhenius(A,b,E)
-            #Check to see if this is the low-pressure rate constant
-            if 'Low' in parameter_type:
-                PerturbLow = True
-            #If we are not treating the high- and low-pressure rate constants separately, then perturb the low-pressure rate constant, too
-            if self.no_falloff:
-                PerturbLow = True
-            if PerturbLow:
-                A = lowrate.pre_exponential_factor
-                b = lowrate.temperature_exponent
-                E = lowrate.activation_energy
-                if 'A' in parameter_type:
-                    if 'Low' in parameter_type: #Just replace the A factor with the new value
-                        A = new_value
-                    else: #Perturb the low-pressure A by the same factor as the high-pressure A
-                        new_low_A = param_info['parameter_low']*perturbation 
-                        A = new_low_A
-                if 'E' in parameter_type:
-                    E = new_value #If activation energies are present, high- and low-pressure rates are optimized separately
-                reaction.low_rate = ct.Arrhenius(A,b,E)    
+        reaction = self._reactions[reaction_number]
+        
+        #The rate expression (rate, high_rate or low_rate) that contains this parameter
+        rate_name = _RATE_ATTRIBUTES[code]
+        rate = getattr(reaction,rate_name)
+        A = rate.pre_exponential_factor
+        b = rate.temperature_exponent
+        E = rate.activation_energy
+        #Remember the original rate expression the first time it is changed, so that reset_model can restore it
+        self._original_rates.setdefault(reaction_number,{}).setdefault(rate_name,(A,b,E))
+        if code in A_FACTOR_TYPES:
+            A = new_value
         else:
-            #Non-falloff reaction
-            rate = reaction.rate
-            A = rate.pre_exponential_factor
-            b = rate.temperature_exponent
-            E = rate.activation_energy
-            if 'A' in parameter_type:
-                A = new_value
-            if 'E' in parameter_type:
-                E = new_value
-            reaction.rate = ct.Arrhenius(A,b,E)
-        
-        time_to_prep = time.time()
-        
-        #print('time to prepare reaction ',time_to_prep-time_start)
-        
+            E = new_value
+        setattr(reaction,rate_name,ct.Arrhenius(A,b,E))
         
-        #print reaction.rate
+        #At most one rate expression has been rebuilt, so the kinetics object is modified only once
         self.gas.modify_reaction(reaction_number,reaction)
-        time_to_modify = time.time()
-        #print('time to modify reaction ',time_to_modify-time_to_prep)
-        #print cti_type
-        #print high_rate_string
-        #print low_rate_string
-        #print eff_string
-        #print rxn_string
     
 #     def _perturb_parameter(self,parameter_id,new_value):
 #         """Replaces a model parameter's value by a new value.
@@ -342,8 +485,6 @@ class CanteraChemistryModel(mumpce.Model):
 #         #print reaction.rate
 
 #         rxn_eq = reaction.equation
-        
-#         time_start = time.time()
  
 #         pressurestring = 'pressure'
 #         HasFallOff = False
@@ -394,15 +535,8 @@ class CanteraChemistryModel(mumpce.Model):
 #                 E = new_value#rate.activation_energy * new_value        
 #             reaction.rate = ct.Arrhenius(A,b,E)
         
-#         time_to_prep = time.time()
-        
-#         #print('time to prepare reaction ',time_to_prep-time_start)
-        
-        
 #         #print reaction.rate
 #         self.gas.modify_reaction(reaction_number,reaction)
-#         time_to_modify = time.time()
-#         #print('time to modify reaction ',time_to_modify-time_to_prep)
 #         #print cti_type
 #         #print high_rate_string
 #         #print low_rate_string
@@ -412,9 +546,18 @@ class CanteraChemistryModel(mumpce.Model):
     def reset_model(self):
         """Reset all model parameters to their original values
         
-        This version works by erasing the chemistry and re-initializing it from the CTI file.
+        The phase object is reset in place rather than recreated: every rate multiplier is set back to 1 and every rate expression changed by :func:`perturb_parameter` is restored from the values saved when it was first changed.
         """
-        self.blank_chemistry()
+        if self.gas is None:
+            self.initialize_chemistry()
+            return
+        self.gas.set_multiplier(1.0)
+        for reaction_number,rates in self._original_rates.items():
+            reaction = self._reactions[reaction_number]
+            for rate_name,(A,b,E) in rates.items():
+                setattr(reaction,rate_name,ct.Arrhenius(A,b,E))
+            self.gas.modify_reaction(reaction_number,reaction)
+        self._original_rates = {}
         self.initialize_chemistry()
         return
     
@@ -452,44 +595,37 @@ class CanteraChemistryModel(mumpce.Model):
         self.gas.set_multiplier(1.0)
         return
     
-    def get_reaction_info(self,reaction_number,reaction):
+    def get_reaction_info(self,reaction_number,reaction,reaction_name=None):
         """Gets information about a particular reaction within a Cantera model and find which parameters it has that might be active. This is called during instantiation of the model and normally would not be called at any other time.
         
         :param reaction_number: The number of the reaction within the Cantera model
         :param reaction: The reaction object corresponding to that number
+        :param reaction_name: The equation of the reaction. If None, it is retrieved from self.gas
         :type reaction_number: int
         :type reaction: Cantera reaction object
+        :type reaction_name: str
         :returns: reaction_info, a list of dictionaries that describe the parameters available in the model
         :rtype: list of dicts
         
         """
         
-        reaction_name = self.gas.reaction_equations([reaction_number])[0]
+        if reaction_name is None:
+            reaction_name = self.gas.reaction_equations([reaction_number])[0]
         
         #All reactions have an A that could be active
         #reaction_info  = [{'reaction_number':reaction_number,'parameter_type':'A_factor','parameter_name':reaction_name}]
         
         
         #Default assumption is that a reaction has no third body efficiencies or falloff behavior
-        HasThirdBody = False #Default, no efficiencies
-        HasFalloff = False #Default, no falloff behavior
         cti_type = 'reaction'
-        
-        if reaction.reaction_type == 4:
-            HasThirdBody = True
-            HasFalloff = True
-        if reaction.reaction_type == 8:
-            HasThirdbody = True
-            HasFalloff = True
-        if reaction.reaction_type ==2:
-            HasThirdBody = True
+        HasThirdBody,HasFalloff = _REACTION_TYPE_FLAGS.get(reaction.reaction_type,(False,False))
         
         if HasFalloff:
             rate = reaction.high_rate
             lowrate = reaction.low_rate
             fullname = reaction_name + ':HpA'
             reaction_info  = [{'reaction_number':reaction_number,
-                               'parameter_type':'High_pressure_A',
+                               'parameter_type':PType.HpA,
                                'parameter_name':fullname,
                                'parameter_value':rate.pre_exponential_factor,
                                'parameter_low':lowrate.pre_exponential_factor}]
@@ -497,32 +633,32 @@ class CanteraChemistryModel(mumpce.Model):
             if abs(rate.activation_energy) > 0.1:
                 fullname = reaction_name + ':HpE'
                 reaction_info += [{'reaction_number':reaction_number,
-                                   'parameter_type':'High_pressure_E',
+                                   'parameter_type':PType.HpE,
                                    'parameter_name':fullname,
                                    'parameter_value':rate.activation_energy}]
-            rate = reaction.low_rate
+            rate = lowrate
             fullname = reaction_name + ':LpA'
             reaction_info += [{'reaction_number':reaction_number,
-                               'parameter_type':'Low_pressure_A',
+                               'parameter_type':PType.LpA,
                                'parameter_name':fullname,
                                'parameter_value':rate.pre_exponential_factor}]
             if abs(rate.activation_energy) > 0.1:
                 fullname = reaction_name + ':LpE'
                 reaction_info += [{'reaction_number':reaction_number,
-                                   'parameter_type':'Low_pressure_E',
+                                   'parameter_type':PType.LpE,
                                    'parameter_name':fullname,
                                    'parameter_value':rate.activation_energy}]
         else:
             rate = reaction.rate
             fullname = reaction_name + ':A'
             reaction_info  = [{'reaction_number':reaction_number,
-                               'parameter_type':'A_factor',
+                               'parameter_type':PType.A,
                                'parameter_name':fullname,
                                'parameter_value':rate.pre_exponential_factor}]
             if abs(rate.activation_energy) > 0.1:
                 fullname = reaction_name + ':E'
                 reaction_info += [{'reaction_number':reaction_number,
-                                   'parameter_type':'Energy',
+                                   'parameter_type':PType.E,
                                    'parameter_name':fullname,
                                    'parameter_value':rate.activation_energy}]
 
@@ -532,170 +668,196 @@ class CanteraChemistryModel(mumpce.Model):
                 if reaction.efficiency(species_name) > 0:
                     fullname = reaction_name + ':Eff:' + species_name
                     reaction_info += [{'reaction_number':reaction_number,
-                                       'parameter_type':'Efficiency',
+                                       'parameter_type':PType.Eff,
                                        'species':species_name,
                                        'parameter_name':fullname,
                                        'parameter_value':reaction.efficiency(species_name)}]
         return reaction_info
     
-    def get_model_parameter_info(self,no_efficiencies=False,no_energy=False,no_falloff=False):
+    def get_model_parameter_info(self,no_efficiencies=False,no_energy=False,no_falloff=False,model=None):
         """Gets the list of available parameters for this model
         
-        :param no_efficiencies: If True, then do not consider the third-body efficiencies as active parameters
+        :param no_efficiencies: If True, then do not consider the third-body efficiencies as active parameters. Efficiencies cannot currently be perturbed, see :func:`perturb_parameter`
         :param no_energies: If True, then do not consider activation energies as active parameters
         :param no_falloff: If True, then do not consider high- and low-pressure limits as active parameters
+        :param model: The Cantera phase object to read the reactions from. If None, self.gas is used, and if that is also None, a new phase object is created from the chemistry model
         :returns: model_parameter_info
         :rtype: list of dicts
         """
-        #Initialize the Cantera model
-        model = ct.Solution(self.chemistry_model)
+        #Reuse the existing Cantera model if there is one, because parsing the chemistry model is expensive
+        if model is None:
+            model = self.gas
+        if model is None:
+            model = ct.Solution(self.chemistry_model)
         #Initialize the model parameter info lists
         model_parameter_info_full = []
-        model_parameter_info = []
+        
+        #Get all of the reaction equations from Cantera at once
+        all_eqs = model.reaction_equations()
         
         #Get the list of possibly-active model parameters
         for reaction_num in range(model.n_reactions):
-            reaction = model.reaction(reaction_num)
-            reac_info = self.get_reaction_info(reaction_num,reaction)
+            if model is self.gas:
+                reaction = self._reactions[reaction_num]
+            else:
+                reaction = model.reaction(reaction_num)
+            reac_info = self.get_reaction_info(reaction_num,reaction,reaction_name=all_eqs[reaction_num])
             model_parameter_info_full += reac_info
-        for param_info in model_parameter_info_full:
-            include_this_parameter = True
-            if no_efficiencies:
-                if param_info['parameter_type'] == 'Efficiency':
-                    include_this_parameter = False
-            #else:
-            #    if param_info[1] == 'Efficiency':
-            #        if not(param_info[2] > 0):
-            #            include_this_parameter = False
-            if no_energy:
-                #We are not perturbing activation energies, so don't consider anything that looks like an activation energy
-                if param_info['parameter_type'] == 'Energy':
-                    include_this_parameter = False
-                if param_info['parameter_type'] == 'Low_pressure_E':
-                    include_this_parameter = False
-                if param_info['parameter_type'] == 'High_pressure_E':
-                    include_this_parameter = False
-            if no_falloff:
-                #We are not perturbing falloff parameters, so don't consider activation energies or low-pressure A factors (low-pressure A factor will be forced to perturb with the high-pressure A factor)
-                if param_info['parameter_type'] == 'Low_pressure_A':
-                    include_this_parameter = False
-                if param_info['parameter_type'] == 'Low_pressure_E':
-                    include_this_parameter = False
-                if param_info['parameter_type'] == 'High_pressure_E':
-                    include_this_parameter = False
-            if include_this_parameter:
-                model_parameter_info += [param_info]
-            #print param_info
+        #Build a mask of the parameter types that are excluded by the flags
+        codes = np.fromiter((param_info['parameter_type'] for param_info in model_parameter_info_full),
+                            dtype=np.int8,count=len(model_parameter_info_full))
+        drop = np.zeros_like(codes,dtype=bool)
+        if no_efficiencies:
+            drop |= (codes == PType.Eff)
+        if no_energy:
+            #We are not perturbing activation energies, so don't consider anything that looks like an activation energy
+            drop |= (codes == PType.E) | (codes == PType.LpE) | (codes == PType.HpE)
+        if no_falloff:
+            #We are not perturbing falloff parameters, so don't consider activation energies or low-pressure A factors (low-pressure A factor will be forced to perturb with the high-pressure A factor)
+            drop |= (codes == PType.LpA) | (codes == PType.LpE) | (codes == PType.HpE)
+        model_parameter_info = [model_parameter_info_full[i] for i in np.nonzero(~drop)[0]]
         #model_parameter_info = np.array(model_parameter_info)
         return model_parameter_info
     
-    def sensitivity(self,perturbation,parameter_list,logfile,tq=True):
+    def _evaluate_perturbed(self,param_id,pos_pert,neg_pert,mult_base):
+        """Evaluates the model with one parameter perturbed upward and downward, then restores that parameter
+        
+        :param param_id: The parameter identifier
+        :param pos_pert: The multiplier for the positive perturbation
+        :param neg_pert: The multiplier for the negative perturbation
+        :param mult_base: The multiplier that the parameter is restored to afterward
+        :returns: valuep,valuem
+        :rtype: float,float
+        """
+        try:
+            self.perturb_parameter(param_id,pos_pert)
+            #print("going into ignition delay problem")
+            valuep = self.evaluate()
+            self.perturb_parameter(param_id,neg_pert)
+            if self._has_load_restart:
+                self.load_restart()
+            valuem = self.evaluate()
+        finally:
+            #The parameter has to be restored before the next parameter is perturbed, otherwise that evaluation would see both perturbations. It is also restored if an evaluation fails.
+            #load_restart only restores the reactor solution, not the chemistry. For A factors on the rate multiplier path this is a cheap set_multiplier call
+            self.perturb_parameter(param_id,mult_base)
+        return valuep,valuem
+    
+    def _worker_state(self):
+        """Creates the picklable payload needed to reconstruct this model in a sensitivity worker process
+        
+        :returns: state_bytes,multipliers
+        :rtype: bytes,list of tuples
+        """
+        #Blank the chemistry of a shallow copy so that this model keeps its Cantera objects
+        clone = copy.copy(self)
+        clone.prepare_for_save()
+        state_bytes = pickle.dumps(clone)
+        
+        #A freshly-loaded chemistry model is unperturbed, so record the parameters that are currently perturbed
+        multipliers = []
+        for param_id in range(self.number_parameters):
+            multiplier = self.get_parameter(param_id)
+            if multiplier != 1.0:
+                multipliers += [(param_id,multiplier)]
+        return state_bytes,multipliers
+    
+    def sensitivity(self,perturbation,parameter_list,logfile,tq=True,n_workers=None):
         """Evaluates the sensitivity of the model value with respect to the model parameters
         
+        If n_workers is larger than 1, the perturbed models are evaluated in a pool of worker processes, each one holding its own copy of this model.
+        
         :param perturbation: The amount to perturb each parameter during the sensitivity analysis
         :param parameter_list: The list of parameters to perturb. This will be a list of parameter identifiers, which are usually ints or strs.
         :param logfile: The logging file that will contain the sensitivity calculation output.
+        :param n_workers: The number of worker processes. Default self.n_workers
         :type perturbation: float
         :type parameter_list: array_like
         :type logfile: str
+        :type n_workers: int
         :returns: model_value,sensitivity_vector
         :rtype: float,ndarray
         """
-        #Intialize the sensitivity vector
-        #sensitivity_vector = np.zeros(len(parameter_list))
-        sensitivity_list = []
+        if n_workers is None:
+            n_workers = self.n_workers
+        
+        #Intialize the sensitivity vector and the perturbed model values
+        sensitivity_vector = np.empty(len(parameter_list))
+        valuep_arr = np.empty(len(parameter_list))
+        valuem_arr = np.empty(len(parameter_list))
         
         #Evaluate the model once and save the result in a restart file
         value = self.evaluate()
-        self.save_restart()
+        if self._has_save_restart:
+            self.save_restart()
         #print("Value = {: 10.5e}".format(value))
         logfile.write("Value = {: 10.5e}\n".format(value))
         
         pos_mult = 1 + perturbation
         neg_mult = 1/pos_mult
         
-        #print pos_mult
-        #print neg_mult
-        
         logfile.write('Rxn  Value+       Value-           Sensitivi   Reaction Name\n')
         
-        #pbar = tqdm.tqdm(total=len(parameter_list))
+        #Each parameter is perturbed independently of the others, so the work items can be evaluated in any order
+        payloads = []
+        for param_id in parameter_list:
+            mult_base = self.get_parameter(param_id)
+            payloads += [(param_id,pos_mult*mult_base,neg_mult*mult_base,mult_base)]
         
+        #The model stays in sensitivity mode only while the perturbed evaluations run, even if one of them raises an exception
         self._sens_flag = True
-        if tq:
-            iterate = enumerate(self.tqfunc(parameter_list,desc=logfile.name))
-        else:
-            iterate = enumerate(parameter_list)
-        for (param_number,param_id) in iterate:
-        #for (param_number,param_id) in enumerate(parameter_list):
-            #pbar.update(1)
-            
-            param_name = self.model_parameter_info[param_id]['parameter_name']
-            
-            time_start = time.time()
-            
-            #mult_base = 1.0#self.get_parameter(param_id)
-            mult_base = self.get_parameter(param_id)
-            time_get = time.time()
-            #print('time to retrieve ',time_get - time_start)
-            pos_pert = pos_mult*mult_base
-            #print pos_pert
-            self.perturb_parameter(param_id,pos_pert)
-            time_pert = time.time()
-            #print('time to perturb ',time_pert - time_get)
-            #print("going into ignition delay problem")
-            valuep = self.evaluate()
-            #for parmid in parameter_list:
-            #    print parmid,self.get_parameter(parmid)
-            neg_pert = neg_mult*mult_base
-            #print neg_pert
-            self.perturb_parameter(param_id,neg_pert)
-            self.load_restart()
-            valuem = self.evaluate()
-            #for parmid in parameter_list:
-            #    print parmid,self.get_parameter(parmid)            
-            self.perturb_parameter(param_id,mult_base)
+        executor = None
+        try:
+            if n_workers > 1 and len(payloads) > 1:
+                state_bytes,multipliers = self._worker_state()
+                executor = concurrent.futures.ProcessPoolExecutor(max_workers=n_workers,
+                                                                  initializer=_sensitivity_worker_init,
+                                                                  initargs=(state_bytes,multipliers))
+                results = executor.map(_sensitivity_worker,*zip(*payloads))
+            else:
+                results = (self._evaluate_perturbed(*payload) for payload in payloads)
+            if tq:
+                results = self.tqfunc(results,total=len(payloads),desc=logfile.name)
             
-            #sensitivity = (delayp - delaym) / (2.0 * perturbation * delay)
-            
-            #sensitivity_vector[param_number] = (valuep - valuem) / (2.0 * perturbation * value)
-            sensitivity = (valuep - valuem) / (2.0 * perturbation * value)
-            sensitivity_list += [sensitivity]
-            
-            #print (delayp - delaym)
-            #print delay
-            #print (delayp - delaym) / delay
-            #print (delayp - delaym) / (2.0 * perturbation * delay)
-            #print sensitivity
-            #print perturbation
-            #print sensitivity_vector[param_number]
-            #print('{: 4d} {: 10.5e}  {: 10.5e}  {: 10.4e}  {}'.format(param_id,
-            #                                                      valuep,valuem,sensitivity_vector[param_number],
-            #                                                      self.gas.reaction_equations([param_id])[0])
-            #       )
-            logfile.write('{: 4d} {: 10.5e}  {: 10.5e}  {: 10.4e}  {}\n'.format(param_id,
-                                                                  valuep,valuem,sensitivity,
-                                                                  param_name)
-            #                                                      self.gas.reaction_equations([param_id])[0])
-                   )
-        #value = math.log(value/1.0e-6)
-        self._sens_flag = False
-        sensitivity_vector = np.array(sensitivity_list)
+            #The results arrive in the order of parameter_list, so each line is logged as soon as its parameter is done
+            for param_number,(valuep,valuem) in enumerate(results):
+                valuep_arr[param_number] = valuep
+                valuem_arr[param_number] = valuem
+                param_id = parameter_list[param_number]
+                sensitivity = (valuep - valuem) / (2.0 * perturbation * value)
+                logfile.write('{: 4d} {: 10.5e}  {: 10.5e}  {: 10.4e}  {}\n'.format(param_id,
+                                                                      valuep,valuem,
+                                                                      sensitivity,
+                                                                      self._param_name_by_id[param_id])
+                       )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            #value = math.log(value/1.0e-6)
+            self._sens_flag = False
+        
+        #sensitivity = (delayp - delaym) / (2.0 * perturbation * delay)
+        _finalize(valuep_arr,valuem_arr,value,perturbation,sensitivity_vector)
+        
         return value, sensitivity_vector
     
     def print_sens(self,sensitivity_vector,print_params=None):
-        """Sorts the parameters by sensitivity coefficient and prints them. Specify max_number to print only max_number parameters
-        """
-        
+        """Sorts the parameters by sensitivity coefficient and prints them. Specify print_params to print only those parameters, in that order
         
+        :param sensitivity_vector: The sensitivity coefficients, indexed by parameter identifier
+        :param print_params: The parameters to print. If None, all parameters are printed in order of decreasing absolute sensitivity
+        :type sensitivity_vector: ndarray
+        :type print_params: array_like
+        """
+        sensitivity_vector = np.asarray(sensitivity_vector)
         if print_params is None:
-            print_params = self.number_parameters
+            order = np.argsort(-np.abs(sensitivity_vector))
+        else:
+            order = np.asarray(print_params,dtype=int)
         
-        for print_param in print_params:
-            print('{: 4d} {: 10.4e}  {}'.format(print_param,
-                                                sensitivity_vector[print_param],
-                                                self.gas.reaction_equations([print_param])[0]
-                                               )
-                 )
+        #Use the stored parameter names, because the phase object is usually blank by the time the results are printed
+        lines = ['{: 4d} {: 10.4e}  {}'.format(print_param,sensitivity_vector[print_param],self._param_name_by_id[print_param])
+                 for print_param in order]
+        sys.stdout.write('\n'.join(lines) + '\n')
         
-        return
\ No newline at end of file
+        return
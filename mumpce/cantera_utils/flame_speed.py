@@ -1,6 +1,69 @@
-from cantera_chemistry_model import CanteraChemistryModel
+from cantera_chemistry_model import CanteraChemistryModel,_njit
 import numpy as np
 import cantera as ct
+import functools
+import io
+import logging
+import multiprocessing
+import pickle
+
+_log = logging.getLogger(__name__)
+
+#The copy of the flame speed model owned by a batch sensitivity worker process. See _batch_worker_init
+_batch_model = None
+
+def _batch_worker_init(state_bytes,multipliers):
+    """Reconstruct a flame speed model inside a worker process of :func:`FlameSpeed.batch_sensitivity`
+    
+    :param state_bytes: The pickled model, which must have been prepared with prepare_for_save so that its restart file exists
+    :param multipliers: A list of (parameter_id,multiplier) pairs for the parameters that were perturbed in the parent model
+    :type state_bytes: bytes
+    :type multipliers: list of tuples
+    """
+    global _batch_model
+    _batch_model = pickle.loads(state_bytes)
+    _batch_model.initialize_chemistry()
+    for (param_id,multiplier) in multipliers:
+        _batch_model.perturb_parameter(param_id,multiplier)
+
+def _batch_worker(work_item):
+    """Compute the sensitivities for one group of parameters inside a worker process
+    
+    :param work_item: (group_number,perturbation,parameter_list)
+    :returns: group_number,model_value,sensitivity_vector,log_text
+    """
+    group_number,perturbation,parameter_list = work_item
+    logfile = io.StringIO()
+    value,sensitivity_vector = _batch_model.sensitivity(perturbation,parameter_list,logfile)
+    return group_number,value,sensitivity_vector,logfile.getvalue()
+
+@_njit
+def _finalize_sens(raw,invSu0,thresh):
+    """Normalizes the adjoint sensitivities by the flame speed and zeroes the ones that are smaller than a threshold
+    
+    :param raw: The raw sensitivities from the adjoint solve
+    :param invSu0: The reciprocal of the unperturbed flame speed
+    :param thresh: Normalized sensitivities with a magnitude below this value are set to zero
+    :returns: The normalized sensitivities
+    :rtype: ndarray
+    """
+    out = raw * invSu0
+    out[np.abs(out) < thresh] = 0.0
+    return out
+
+def _maybe_slice(parameter_list):
+    """Return a slice equivalent to parameter_list if it is a range with a step of 1
+    
+    Indexing with a slice returns a view, whereas indexing with a list makes a copy. Only a range can be recognized without a pass over the parameter list, 
+    so any other parameter list is returned unchanged and used as a fancy index
+    
+    :param parameter_list: The list of parameter identifiers
+    :type parameter_list: array_like
+    :returns: slice(start,stop) if parameter_list is a range with a step of 1, otherwise parameter_list
+    """
+    if isinstance(parameter_list,range) and parameter_list.step == 1:
+        return slice(parameter_list.start,parameter_list.stop)
+    return parameter_list
 
 class FlameSpeed(CanteraChemistryModel):
     """A model for laminar flame speed
@@ -20,6 +83,7 @@ class FlameSpeed(CanteraChemistryModel):
     :param domain_length: The length of the computational domain, in meters, default 1
     :param initial_points: The number of initial grid points in the computational domain, default 10
     :param loglevel: The loglevel for the Cantera flame solver, default 2
+    :param use_gpu_solver: If True, use a GPU banded linear solver in the flame solver when the Cantera build provides one, default False
     :type T: float
     :type Patm: float
     :type composition: str,ndarray(float)
@@ -27,25 +91,56 @@ class FlameSpeed(CanteraChemistryModel):
     :type domain_length: float
     :type initial_points: int
     :type loglevel: int
+    :type use_gpu_solver: bool
     
     """
     def __init__(self,
               T,Patm,composition,
               chemistry_model,
               domain_length=1.0,initial_points=10,
-              loglevel=2,name='soln',**kwargs):
+              loglevel=2,name='soln',use_gpu_solver=False,**kwargs):
         
         super(FlameSpeed,self).__init__(T,Patm,composition,chemistry_model,**kwargs)
         
-        self._initial_grid = np.linspace(0,domain_length,initial_points)
+        #Only the grid dimensions are kept. The grid itself is needed just once, when the flame object is created in initialize_reactor
+        self._domain_length = domain_length
+        self._initial_points = initial_points
         
         self.loglevel = loglevel
+        self.use_gpu_solver = use_gpu_solver
+        
+        #Flame speed sensitivities with a magnitude below this value are reported as zero. The default keeps all of them
+        self.sensitivity_threshold = 0.0
         
         self.savefile = name + '.xml'
         self._restart = None
         
+        #The adjoint bookkeeping for sensitivity, (grid length, Nvars, dgdx). It depends only on the grid, so it is rebuilt only when the number of grid points changes
+        self._dgdx_cache = None
+        
+        #The conditions (T,P,composition) of the converged solution saved as the 'warm' solution in the restart file, or None if there is none
+        self._warm_key = None
+        
         return
     
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def _make_initial_grid(domain_length,initial_points):
+        """Make the initial grid for a flame, shared between all flames with the same domain length and number of points
+        
+        The grid is read-only. Cantera copies it when the flame is created, so sharing it is safe
+        
+        :param domain_length: The length of the computational domain, in meters
+        :param initial_points: The number of initial grid points in the computational domain
+        :type domain_length: float
+        :type initial_points: int
+        :returns: The initial grid
+        :rtype: ndarray
+        """
+        grid = np.linspace(0,domain_length,initial_points)
+        grid.setflags(write=False)
+        return grid
+    
     def __str__(self):
         
         str_args = (self.initial.T,                    
@@ -62,7 +157,14 @@ class FlameSpeed(CanteraChemistryModel):
         """
         
         #Create the Cantera free flame object
-        self.simulation = ct.FreeFlame(self.gas,self._initial_grid)
+        self.simulation = ct.FreeFlame(self.gas,FlameSpeed._make_initial_grid(self._domain_length,self._initial_points))
+        
+        #Select the GPU banded linear solver if requested. Cantera builds without one keep the default solver
+        if self.use_gpu_solver:
+            if hasattr(type(self.simulation),'linear_solver_type'):
+                self.simulation.linear_solver_type = 'GPU'
+            else:
+                _log.warning('use_gpu_solver was requested, but this Cantera build has no GPU linear solver. Using the default solver')
         
         #Define the steady-state and time-stepping relative and absolute tolerances
         tol_ss = [1e-5,1e-12]
@@ -74,67 +176,126 @@ class FlameSpeed(CanteraChemistryModel):
         #Set the solution bounds. Allow solution components to be small and negative for ease of convergence
         self.simulation.flame.set_bounds(Y=(-1e-5,1))
         
+        #The index of the flame speed in the global solution vector, used to build the adjoint right-hand side in sensitivity
+        self._i_Su = self.simulation.inlet.n_components + self.simulation.flame.component_index('u')
+        
+        return
+    
+    def _reactor_matches_gas(self):
+        """Check whether the existing flame object can be reused
+        
+        :returns: True if there is a flame object and it was created for the current phase object
+        :rtype: bool
+        """
+        return self.simulation is not None and self.simulation.gas is self.gas
+    
+    def _set_inlet_state(self):
+        """Set the unburned gas state at the flame inlet to the state in self.initial
+        """
+        self.simulation.P = self.initial.P
+        self.simulation.inlet.T = self.initial.T
+        self.simulation.inlet.X = self.initial.composition
+        return
+    
+    def blank_chemistry(self):
+        """Erase the Cantera objects, along with the adjoint bookkeeping that belongs to the flame object
+        """
+        super(FlameSpeed,self).blank_chemistry()
+        self._dgdx_cache = None
+    
+    def _solve_mixture_averaged(self):
+        """Solve the flame from scratch with mixture-averaged transport
+        
+        The solution is started from the equilibrium profile for the inlet state in self.initial. Raises a Cantera.CanteraError if there is no solution, see :func:`_solve_failed`
+        """
+        #The auto option lets Cantera choose the solution strategy itself. It tries the full problem first and falls back to other strategies 
+        #and grid refinement if that fails, instead of stepping through each stage from here
+        self.simulation.energy_enabled = True
+        self.simulation.transport_model = 'Mix'
+        self.simulation.soret_enabled = False
+        self.simulation.set_max_jac_age(10,10)
+        self.simulation.set_time_step(1e-5, [2,5,10,20])
+        self.simulation.set_refine_criteria(ratio=10, slope=0.06, curve=0.08,prune=0.0)
+        
+        #A reused flame object still has the inlet state of the previous solution
+        self._set_inlet_state()
+        
+        #Cantera only builds the initial guess itself for a flame that has never been solved or restored, so a reused flame has to be reset to the 
+        #equilibrium profile for the new inlet state
+        self.simulation.set_initial_guess()
+        
+        if self.loglevel > 0:
+            _log.debug('Mixture-averaged solution')
+        try:
+            self.simulation.solve(loglevel=self.loglevel,auto=True)
+        except ct.CanteraError as err:
+            self._solve_failed('mixture-averaged',err)
+        return
+    
+    def _solve_failed(self,stage,err):
+        """Log a failed flame solve and raise an error that says which flame and which stage failed
+        
+        Every stage of :func:`evaluate` that has no other way to recover goes through this method, so a flame with no solution always raises rather than returning the flame speed of an unconverged solution
+        
+        :param stage: The name of the stage that failed
+        :param err: The exception raised by the Cantera solver
+        :type stage: str
+        :type err: Cantera.CanteraError
+        """
+        _log.warning('Could not find a %s solution: %s',stage,self)
+        raise ct.CanteraError('Could not find a {} solution for {}: {}'.format(stage,self,err)) from err
+    
+    def _solve_multicomponent(self):
+        """Solve the flame with multicomponent transport and thermal diffusion, starting from the current solution
+        
+        Raises the Cantera exception if there is no solution
+        """
+        if self.loglevel > 0:
+            _log.debug('Multicomponent solution')
+        self.simulation.energy_enabled = True
+        self.simulation.transport_model = 'Multi'
+        self.simulation.soret_enabled = True
+        #self.simulation.set_refine_criteria(ratio=10, slope=0.01, curve=0.01,prune=1.0e-5)
+        self.simulation.set_refine_criteria(ratio=10, slope=0.06, curve=0.08,prune=1.0e-4)
+        self.simulation.solve(loglevel=self.loglevel,refine_grid=True)
         return
     
     def evaluate(self):
         """Compute the laminar flame speed
         
+        A failed warm start falls back to solving from scratch. Any other failed solve raises a Cantera.CanteraError naming the flame, so callers running several flames must handle the error if they want to continue past one that has no solution
+        
         :returns: Laminar flame speed in cm/s
         
         """        
         #Initialize the Cantera thermo and laminar flame object
         if self.gas is None:
             self.initialize_chemistry()
-        if self.simulation is None:
+        #The flame object, its grid and its solver workspace are reused from one call to the next. It is only rebuilt when the phase object has been replaced
+        if not self._reactor_matches_gas():
             self.initialize_reactor()
         
         # There are three possible cases that need to be considered. 
         #If self._restart is None and self._sens_flag is False, then no solution exists and one must be created from scratch
         if self._restart is None and self._sens_flag is False:
-            #Solve the flame with no energy equation, mixture-averaged transport, and no grid refinement
-            self.simulation.energy_enabled = False
-            self.simulation.transport_model = 'Mix'
-            self.simulation.set_max_jac_age(10,10)
-            self.simulation.set_time_step(1e-5, [2,5,10,20])
-            
-            print (self.simulation.energy_enabled)
-            print (self.simulation.transport_model)
-            print ('Mixture-averaged solution, no energy equation, no grid refinement')
-            #This is a hack, because for some reason the first attempt at solving the flame fails, 
-            #but the second attempt succeeds
-            try:
-                #We expect this first attempt to fail, so wrap in a try ... except clause to force a second attempt
-                self.simulation.solve(loglevel=self.loglevel,refine_grid=False)
-            except:
-                print ('As predicted, first attempt failed, trying one more time')
+            warm = self._restore_warm_start()
+            if warm:
+                #A converged solution at these conditions is available from a previous call, so skip the mixture-averaged bootstrap
                 try:
-                    self.simulation.solve(loglevel=self.loglevel,refine_grid=False)
-                except:
-                    print ('Could not find a solution')
-            
-            print ('Mixture-averaged solution, enable energy equation and grid refinement')
-            #Enable the energy equation and grid refinement
-            self.simulation.energy_enabled = True
-            self.simulation.set_refine_criteria(ratio=10, slope=0.06, curve=0.08,prune=0.0)
-            try:
-                self.simulation.solve(loglevel=self.loglevel,refine_grid=True)
-            except:
-                print ('As predicted, first attempt failed, trying one more time')
+                    self._solve_multicomponent()
+                except ct.CanteraError:
+                    _log.warning('Could not solve from the warm start, solving from scratch: %s',self)
+                    warm = False
+            if not warm:
+                self._solve_mixture_averaged()
                 try:
-                    self.simulation.solve(loglevel=self.loglevel,refine_grid=True)
-                except:
-                    print ('Could not find a solution')
-        
-            print ('Multicomponent solution')
-            #Multicomponent diffusion
-            self.simulation.transport_model = 'Multi'
-            self.simulation.soret_enabled = True
-            #self.simulation.set_refine_criteria(ratio=10, slope=0.01, curve=0.01,prune=1.0e-5)
-            self.simulation.set_refine_criteria(ratio=10, slope=0.06, curve=0.08,prune=1.0e-4)
+                    self._solve_multicomponent()
+                except ct.CanteraError as err:
+                    self._solve_failed('multicomponent',err)
             try:
-                self.simulation.solve(loglevel=self.loglevel,refine_grid=True)
+                self.save_warm_start()
             except:
-                print ('Could not find a solution')
+                _log.warning('Could not save the warm start solution to %s',self.savefile)
         #If self._sens_flag is True, then this is a sensitivity calculation. A nominal value calculation is available 
         elif self._sens_flag is True:
             self.simulation.energy_enabled = True
@@ -156,8 +317,8 @@ class FlameSpeed(CanteraChemistryModel):
             self.simulation.set_refine_criteria(ratio=10, slope=0.06, curve=0.08,prune=1.0e-4)
             try:
                 self.simulation.solve(loglevel=self.loglevel,refine_grid=False)
-            except:
-                print ('Could not find a solution')
+            except ct.CanteraError as err:
+                self._solve_failed('restarted',err)
         
         flame_speed_cm = self.simulation.u[0] / 1.0e-2
         return flame_speed_cm
@@ -180,13 +341,13 @@ class FlameSpeed(CanteraChemistryModel):
         value = self.evaluate()
         
         full_sensitivity = self.simulation.get_flame_speed_reaction_sensitivities()
-        sensitivity_vector = full_sensitivity[parameter_list]
+        sensitivity_vector = full_sensitivity[_maybe_slice(parameter_list)]
         
         logfile.write("Value = {: 10.5e}\n".format(value))
         logfile.write('Rxn  Sensitivity   Reaction Name\n')
-        for param_number,(param_id,sensitivity) in enumerate(zip(parameter_list,sensitivity_vector)):
-            param_name = self.model_parameter_info[param_id]['parameter_name']
-            logfile.write('{: 4d}  {: 10.4e}  {}\n'.format(param_id,sensitivity,param_name))
+        param_names = [self._param_name_by_id[param_id] for param_id in parameter_list]
+        logfile.writelines('{: 4d}  {: 10.4e}  {}\n'.format(param_id,sensitivity,param_name)
+                           for (param_id,sensitivity,param_name) in zip(parameter_list,sensitivity_vector,param_names))
         
         return value,sensitivity_vector        
     
@@ -207,35 +368,91 @@ class FlameSpeed(CanteraChemistryModel):
         
         value = self.evaluate()
         
+        #Resolve each parameter to its reaction number once, because perturb is called several times per parameter from inside the adjoint solver
+        resolved = [(param_id,self._rxn_num[param_id],self._use_multiplier[param_id]) for param_id in parameter_list]
+        param_names = [self._param_name_by_id[param_id] for param_id in parameter_list]
+        
+        #solve_adjoint evaluates the residual right after each call to perturb, so every change has to reach the phase object immediately. 
+        #Collecting the changes and applying them together would make the solver see the unperturbed rates
         def perturb(sim,i,dp):
-            param_id = parameter_list[i]
-            mult_base = self.get_parameter(param_id)
+            param_id,rxn_num,use_multiplier = resolved[i]
             new_value = 1+dp #mult_base*(1+dp)
-            self.perturb_parameter(param_id,new_value)
+            if use_multiplier:
+                self.gas.set_multiplier(new_value,rxn_num)
+            else:
+                self.perturb_parameter(param_id,new_value)
         
         ###Adapted from Cantera.FlameSpeed.get_flame_reaction_sensitivities
         def g(sim):
             return sim.u[0]
 
-        Nvars = sum(D.n_components * D.n_points for D in self.simulation.domains)
-        i_Su = self.simulation.inlet.n_components + self.simulation.flame.component_index('u')
-        dgdx = np.zeros(Nvars)
-        dgdx[i_Su] = 1
+        grid_len = len(self.simulation.grid)
+        if self._dgdx_cache is None or self._dgdx_cache[0] != grid_len:
+            Nvars = sum(D.n_components * D.n_points for D in self.simulation.domains)
+            self._dgdx_cache = (grid_len,Nvars,np.zeros(Nvars))
+        grid_len,Nvars,dgdx = self._dgdx_cache
+        dgdx.fill(0)
+        dgdx[self._i_Su] = 1
         Su0 = g(self.simulation)
         
         
-        full_sensitivity = self.simulation.solve_adjoint(perturb,len(parameter_list),dgdx)/Su0
+        full_sensitivity = _finalize_sens(self.simulation.solve_adjoint(perturb,len(parameter_list),dgdx),1.0/Su0,self.sensitivity_threshold)
                                                          #self.simulation.get_flame_speed_reaction_sensitivities()
         sensitivity_vector = full_sensitivity#[parameter_list]
         
+        self._write_sensitivity_log(logfile,value,parameter_list,sensitivity_vector,param_names)
+        
+        return value,sensitivity_vector
+    
+    def _write_sensitivity_log(self,logfile,value,parameter_list,sensitivity_vector,param_names):
+        """Write the model value and the sensitivity of each parameter to the sensitivity logfile
+        """
         logfile.write("Value = {: 10.5e}\n".format(value))
         logfile.write('Rxn  Sensitivity   Reaction Name\n')
-        for param_number,(param_id,sensitivity) in enumerate(zip(parameter_list,sensitivity_vector)):
-            param_name = self.model_parameter_info[param_id]['parameter_name']
-            logfile.write('{: 4d}  {: 10.4e}  {}\n'.format(param_id,sensitivity,param_name))
+        logfile.writelines('{: 4d}  {: 10.4e}  {}\n'.format(param_id,sensitivity,param_name)
+                           for (param_id,sensitivity,param_name) in zip(parameter_list,sensitivity_vector,param_names))
+    
+    def batch_sensitivity(self,perturbation,grouped_parameter_lists,logfile,n_workers=None):
+        """Evaluates the sensitivities for several groups of parameters, distributing the groups over a pool of worker processes
         
-        return value,sensitivity_vector
+        The current solution is saved to the restart file once. Each worker process owns its own copy of the model, loads that restart and calls :func:`sensitivity` for each group it receives.
         
+        :param perturbation: The amount to perturb each parameter during the sensitivity analysis
+        :param grouped_parameter_lists: A list of parameter lists. Each one is passed to :func:`sensitivity` separately
+        :param logfile: The logging file that will contain the sensitivity calculation output. The output for each group is written in the order of grouped_parameter_lists
+        :param n_workers: The number of worker processes. Default self.n_workers
+        :type perturbation: float
+        :type grouped_parameter_lists: list of array_like
+        :type logfile: file
+        :type n_workers: int
+        :returns: A list containing (model_value,sensitivity_vector) for each group
+        :rtype: list of tuples
+        """
+        if n_workers is None:
+            n_workers = self.n_workers
+        
+        if n_workers <= 1:
+            return [self.sensitivity(perturbation,parameter_list,logfile) for parameter_list in grouped_parameter_lists]
+        
+        #Make sure that there is a converged solution for the workers to start from
+        self.evaluate()
+        state_bytes,multipliers = self._worker_state()
+        
+        work_items = [(group_number,perturbation,parameter_list) for (group_number,parameter_list) in enumerate(grouped_parameter_lists)]
+        results = [None] * len(work_items)
+        log_texts = [None] * len(work_items)
+        pool = multiprocessing.Pool(processes=n_workers,initializer=_batch_worker_init,initargs=(state_bytes,multipliers))
+        try:
+            for (group_number,value,sensitivity_vector,log_text) in pool.imap_unordered(_batch_worker,work_items):
+                results[group_number] = (value,sensitivity_vector)
+                log_texts[group_number] = log_text
+        finally:
+            pool.close()
+            pool.join()
+        
+        for log_text in log_texts:
+            logfile.write(log_text)
+        return results
         
     def load_restart(self,filename=None,solution_name='restart'):
         """Load a solution from a restart file and set the self.restart flag so that the model knows that a restart has been read
@@ -266,12 +483,59 @@ class FlameSpeed(CanteraChemistryModel):
         """Tells the model that it should ignore the data in the restart file and instead generate a solution from scratch
         """
         self._restart = None
+        self._warm_key = None
+    
+    def save_warm_start(self):
+        """Save the current flame solution as a warm start for later solutions at the same conditions
+        
+        The solution is saved under the name 'warm' in the restart file. When :func:`evaluate` would otherwise solve the flame from scratch, it restores this solution instead if the conditions in self.initial have not changed, see :func:`_restore_warm_start`.
+        """
+        self.simulation.save(self.savefile,name='warm',description='Warm start for ' + str(self),loglevel=0)
+        self._warm_key = (self.initial.T,self.initial.P,self.initial.composition)
+    
+    def _restore_warm_start(self,rtol=1.0e-6):
+        """Restore the warm start solution into the flame object if it was computed at the conditions in self.initial
+        
+        Several flames can share one restart file, so the inlet state stored with the solution in the file is checked as well as the conditions this model last saved
+        
+        :param rtol: The relative tolerance for comparing temperature, pressure, and composition
+        :returns: True if the warm start solution was restored
+        :rtype: bool
+        """
+        if not self._warm_start_available(rtol):
+            return False
+        try:
+            self.simulation.restore(self.savefile,name='warm',loglevel=0)
+        except:
+            return False
+        
+        #Compare the restored inlet state with self.initial, converting a composition string to mole fractions through the phase object
+        self.gas.TPX = self.initial.T, self.initial.P, self.initial.composition
+        return (np.isclose(self.simulation.inlet.T,self.initial.T,rtol=rtol)
+                and np.isclose(self.simulation.P,self.initial.P,rtol=rtol)
+                and np.allclose(self.simulation.inlet.X,self.gas.X,rtol=rtol,atol=1.0e-12))
+    
+    def _warm_start_available(self,rtol=1.0e-6):
+        """Check whether the warm start solution was computed at the conditions in self.initial
+        
+        :param rtol: The relative tolerance for comparing temperature, pressure, and composition
+        :returns: True if the warm start can be used
+        :rtype: bool
+        """
+        if self._warm_key is None:
+            return False
+        T,P,composition = self._warm_key
+        if not (np.isclose(T,self.initial.T,rtol=rtol) and np.isclose(P,self.initial.P,rtol=rtol)):
+            return False
+        if isinstance(composition,str) or isinstance(self.initial.composition,str):
+            return composition == self.initial.composition
+        return np.allclose(composition,self.initial.composition,rtol=rtol)
     
     def prepare_for_save(self):
         try:
             self.save_restart() #Save the current solution to restart, because we are about to erase the Cantera reactors
         except:
-            print('No data saved from flame speed solution') #If there is an error, assume that there is no solution and proceed to blank the chemistry
+            _log.debug('No data saved from flame speed solution') #If there is an error, assume that there is no solution and proceed to blank the chemistry
             
         self.blank_chemistry() #blank out the chemistry so we can pickle the object
         return
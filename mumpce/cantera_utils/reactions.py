@@ -1,4 +1,4 @@
-from cantera_chemistry_model import CanteraChemistryModel
+from cantera_chemistry_model import CanteraChemistryModel,A_FACTOR_TYPES,ENERGY_TYPES,FALLOFF_TYPES
 import numpy as np
 import cantera as ct
 import mumpce
@@ -63,9 +63,9 @@ class RxnMeasurement(mumpce.Measurement):
                                                                               sens_zero,
                                                                               self.parameter_uncertainties)):
             parameter_type = self.model.model_parameter_info[parameter]['parameter_type']
-            if 'A' in parameter_type:
+            if parameter_type in A_FACTOR_TYPES:
                 a_terms[parameter_number] = sens_val * np.log(uncert)
-            if 'E' in parameter_type:
+            if parameter_type in ENERGY_TYPES:
                 a_terms[parameter_number] = sens_val * (uncert - 1)
         
         self.response = ResponseSurface(zero_term=zero_term,
@@ -129,7 +129,7 @@ class ReactionRateBase(CanteraChemistryModel):
         :returns: model_value,sensitivity_vector
         :rtype: float,ndarray
         """
-        sensitivity_list = []
+        sensitivity_vector = np.empty(len(parameter_list),dtype=np.float64)
         
         value = self.evaluate()
         logfile.write("Value = {: 10.5e}\n".format(value))
@@ -150,11 +150,11 @@ class ReactionRateBase(CanteraChemistryModel):
                 parameter_type = param_info['parameter_type']
                 
                 #Simple Arrhenius expression has a very simple form for the sensitivity
-                if 'pressure' not in parameter_type:
+                if parameter_type not in FALLOFF_TYPES:
                 #if False:
-                    if 'A' in parameter_type:
+                    if parameter_type in A_FACTOR_TYPES:
                         sensitivity = 1.0
-                    if 'E' in parameter_type:
+                    if parameter_type in ENERGY_TYPES:
                         E = self.get_parameter(param_id)
                         sensitivity = -E/(ct.gas_constant*self.initial.T)
                 else: #More complex reaction -> do brute sensitivity
@@ -177,9 +177,7 @@ class ReactionRateBase(CanteraChemistryModel):
                 if param_id in self.denominator_list:
                     sensitivity = sensitivity * -1.0
             
-            sensitivity_list += [sensitivity]
-        
-        sensitivity_vector = np.array(sensitivity_list)
+            sensitivity_vector[param_number] = sensitivity
         
         return value,sensitivity_vector
     
@@ -325,7 +323,7 @@ class ReactionARatio(ReactionRateBase):
         self.denominator_list = []
         
         for (param_number,param_info) in enumerate(self.model_parameter_info):
-            if 'A' in param_info['parameter_type']:
+            if param_info['parameter_type'] in A_FACTOR_TYPES:
                 if param_info['reaction_number'] == reaction_numerator:
                     self.numer_num = param_number
                     self.numer_name = param_info['parameter_name']
@@ -389,7 +387,7 @@ class ReactionEDiff(ReactionRateBase):
         self.denominator_list = []
         
         for (param_number,param_info) in enumerate(self.model_parameter_info):
-            if 'E' in param_info['parameter_type']:
+            if param_info['parameter_type'] in ENERGY_TYPES:
                 if param_info['reaction_number'] == reaction_numerator:
                     self.numer_num = param_number
                     self.numer_name = param_info['parameter_name']
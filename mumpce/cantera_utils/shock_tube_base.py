@@ -7,7 +7,7 @@ class ShockTube(CanteraChemistryModel):
     
     This is a class that will create a simulation of a shock tube. The shock tube simulations are subclasses of this class. It is a subclass of :func:`cantera_chemistry_model`, which is in turn a subclass of :func:`model`. You cannot instantiate a member of this class because it does not have an :func:`evaluate` method.
     
-    This class implements the :func:`initialize_reactor` method required by :func:`cantera_chemistry_model`. It also redefines :func:`reset_model`.
+    This class implements the :func:`initialize_reactor` method required by :func:`cantera_chemistry_model`.
     
     :param T: The unburned gas temperature in Kelvins
     :param Patm: The pressure in atmospheres (will be converted internally to Pa)
@@ -42,133 +42,3 @@ class ShockTube(CanteraChemistryModel):
         
         
         return
-    
-    def get_parameter_thisisthecomplicatedonethatdoesntwork(self,parameter):
-        param_info = self.model_parameter_info[parameter]
-        reaction_number = param_info['reaction_number']
-        parameter_type = param_info['parameter_type']
-        
-        reaction = self.gas.reaction(reaction_number)
-        rate = None
-        efficiencies = None
-        
-        if parameter_type == 'A_factor':
-            rate = reaction.rate
-            parameter_value = rate.pre_exponential_factor
-        if parameter_type == 'Energy':
-            rate = reaction.rate
-            parameter_value = rate.activation_energy
-        if parameter_type == 'High_pressure_A':
-            rate = reaction.high_rate
-            parameter_value = rate.pre_exponential_factor
-        if parameter_type == 'High_pressure_E':
-            rate = reaction.high_rate
-            parameter_value = rate.activation_energy
-        if parameter_type == 'Low_pressure_A':
-            rate = reaction.low_rate
-            parameter_value = rate.pre_exponential_factor
-        if parameter_type == 'Low_pressure_E':
-            rate = reaction.low_rate
-            parameter_value = rate.activation_energy
-        if parameter_type == 'Efficiency':
-            efficiencies = reaction.efficiencies
-            species = param_info['species']
-            parameter_value = efficiencies[species]
-        return parameter_value
-    
-    def perturb_parameter_thisisthecomplicatedonethatdoesntwork(self,parameter,new_value):
-        param_info = self.model_parameter_info[parameter]
-        reaction_number = param_info['reaction_number']
-        parameter_type = param_info['parameter_type']
-        
-        print (parameter)
-        print (param_info)
-        
-        reaction = self.gas.reaction(reaction_number)
-        print (reaction.rate)
-        rate = None
-        efficiencies = None
-        reactants = reaction.reactant_string
-        products = reaction.product_string
-        
-        rtype = reaction.reaction_type
-        
-        pressurestring = 'pressure'
-        HasFalloff = False
-        
-        if pressurestring in parameter_type:
-            HasFalloff = True
-        if HasFalloff:
-            highrate = reaction.high_rate
-            lowrate = reaction.low_rate
-            if rtype == 4:
-                newreaction = ct.FalloffReaction(reactants=reactants,products=products)
-            if rtype == 8:
-                newreaction = ct.ChemicallyActivatedReaction(reactants=reactants,products=products)
-        else:
-            rate = reaction.rate
-            if rtype == 2:
-                newreaction = ct.ThreeBodyReaction(reactants=reactants,products=products)
-            else:
-                newreaction = ct.ElementaryReaction(reactants=reactants,products=products)
-        
-            
-        
-        if parameter_type == 'A_factor':
-            old_A = rate.pre_exponential_factor
-            old_b = rate.temperature_exponent
-            old_E = rate.activation_energy
-            new_A = new_value
-            newreaction.rate = ct.Arrhenius(A=new_A,b=old_b,E=old_E)
-        if parameter_type == 'Energy':
-            old_A = rate.pre_exponential_factor
-            old_b = rate.temperature_exponent
-            old_E = rate.activation_energy
-            new_E = new_value
-            newreaction.rate = ct.Arrhenius(A=old_A,b=old_b,E=new_E)
-        if parameter_type == 'High_pressure_A':
-            rate = highrate
-            old_A = rate.pre_exponential_factor
-            old_b = rate.temperature_exponent
-            old_E = rate.activation_energy
-            new_A = new_value
-            newreaction.high_rate = ct.Arrhenius(A=new_A,b=old_b,E=old_E)
-        if parameter_type == 'High_pressure_E':
-            rate = highrate
-            old_A = rate.pre_exponential_factor
-            old_b = rate.temperature_exponent
-            old_E = rate.activation_energy
-            new_E = new_value
-            newreaction.high_rate = ct.Arrhenius(A=old_A,b=old_b,E=new_E)
-        if parameter_type == 'Low_pressure_A':
-            rate = lowrate
-            old_A = rate.pre_exponential_factor
-            old_b = rate.temperature_exponent
-            old_E = rate.activation_energy
-            new_A = new_value
-            newreaction.low_rate = ct.Arrhenius(A=new_A,b=old_b,E=old_E)
-        if parameter_type == 'Low_pressure_E':
-            rate = lowrate
-            old_A = rate.pre_exponential_factor
-            old_b = rate.temperature_exponent
-            old_E = rate.activation_energy
-            new_E = new_value
-            newreaction.low_rate = ct.Arrhenius(A=old_A,b=old_b,E=new_E)
-            
-        self.gas.modify_reaction(reaction_number,newreaction)
-            
-        if parameter_type == 'Efficiency':
-            efficiencies = copy.deepcopy(reaction.efficiencies)
-            species = param_info['species']
-            efficiencies[species] = new_value
-            reaction.efficiencies = efficiencies
-        return 
-    
-    def reset_model(self):
-        """Reset all model parameters to their original values
-        
-        This version works by erasing the chemistry and re-initializing it from the CTI file.
-        """
-        self.blank_chemistry()
-        self.initialize_chemistry()
-        return
@@ -1,5 +1,6 @@
 import cantera as ct
 import numpy as np
+from mumpce.cantera_utils import A_FACTOR_TYPES,ENERGY_TYPES
 
 def read_uncertainties(uncertainty_file=None,mumpce_cantera_model=None):
     #Read the uncertainty file
@@ -43,10 +44,10 @@ def read_uncertainties(uncertainty_file=None,mumpce_cantera_model=None):
         value = np.abs(param_info['parameter_value'])
         
         uncertainty = a_factor_uncertainties[reaction_number]
-        if 'A' in parameter_type:
+        if parameter_type in A_FACTOR_TYPES:
             #For an A-factor, the uncertainty factor is just the number from uncertainty_file
             parameter_uncertainties[param_number] = uncertainty
-        if 'E' in parameter_type:
+        if parameter_type in ENERGY_TYPES:
             #For an activation energy, assume that it contributes the same amount to the uncertainty as the A-factor at 1000 K
             #This number is arbitrary
             #value = np.abs(mumpce_cantera_model.get_parameter(param_number))